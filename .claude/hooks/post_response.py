@@ -14,21 +14,29 @@ import tempfile
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+# Fenced diff blocks; when several tags are present the first in
+# _FENCE_PRIORITY wins
+_FENCED_DIFF_RE = re.compile(r'```(diff|patch|unified-diff)\n(.*?)```', re.DOTALL)
+_FENCE_PRIORITY = ('diff', 'patch', 'unified-diff')
+# Bare ---/+++/@@ hunks outside any fence
+_RAW_HUNK_RE = re.compile(r'---.*?\n\+\+\+.*?\n@@.*?@@.*?(?=\n(?:---|\+\+\+|$))', re.DOTALL)
+
 def extract_unified_diff(response: str) -> Optional[str]:
     """Extract unified diff from response text"""
-    # Look for diff blocks
-    diff_patterns = [
-        r'```diff\n(.*?)```',
-        r'```patch\n(.*?)```',
-        r'```unified-diff\n(.*?)```',
-        r'---.*?\n\+\+\+.*?\n@@.*?@@.*?(?=\n(?:---|\+\+\+|$))',
-    ]
+    # Look for fenced diff blocks, grouped by fence tag in a single scan
+    fenced_blocks = {}
+    for match in _FENCED_DIFF_RE.finditer(response):
+        fenced_blocks.setdefault(match.group(1), []).append(match.group(2))
     
-    for pattern in diff_patterns:
-        matches = re.findall(pattern, response, re.DOTALL)
-        if matches:
+    for fence in _FENCE_PRIORITY:
+        if fence in fenced_blocks:
             # Combine all diff blocks
-            return '\n'.join(matches)
+            return '\n'.join(fenced_blocks[fence])
+    
+    # Fall back to bare unified diff hunks
+    matches = _RAW_HUNK_RE.findall(response)
+    if matches:
+        return '\n'.join(matches)
     
     # Check if entire response looks like a diff
     if response.startswith(('---', 'diff', '@@')):
@@ -145,7 +153,8 @@ def run_linting() -> Tuple[bool, List[Dict]]:
 
 def extract_affected_files(diff_content: str) -> List[str]:
     """Extract list of files affected by diff"""
-    files = []
+    # Dict keys dedupe files touched by several hunks, keeping first-seen order
+    files = {}
     
     # Look for +++ lines in unified diff
     for line in diff_content.split('\n'):
@@ -156,9 +165,9 @@ def extract_affected_files(diff_content: str) -> List[str]:
                 file_path = parts[1]
                 if file_path.startswith('b/'):
                     file_path = file_path[2:]
-                files.append(file_path)
+                files[file_path] = None
     
-    return files
+    return list(files)
 
 def prepare_retry_context(failures: List[Dict], lint_issues: List[Dict], 
                          affected_files: List[str]) -> str:
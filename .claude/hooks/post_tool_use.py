@@ -7,20 +7,81 @@ Post-Tool Hook for Multi-Mode Policy Validation
 - Override mechanisms for prototyping and special cases
 """
 
+import bisect
+import io
 import json
 import sys
 import re
 import os
-import warnings
-from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set
+
+# Path keywords that select a validation mode, one alternation per mode
+_STRICT_PATH_RE = re.compile(r'prod|production|deploy|release|main\.py|__init__\.py')
+_SUGGEST_PATH_RE = re.compile(r'prototype|experimental|demo|example|temp|tmp')
+_OVERRIDE_RE = re.compile(r'# @policy-override:\s*(\w+)')
+
+# File types that are never policy-validated
+_SKIP_EXTENSIONS = frozenset({'.md', '.txt', '.json', '.yaml', '.yml', '.xml', '.html', '.log'})
+# Documentation trees may hold intentional examples of violations. Each
+# entry is a whole path component, matched against the path with a
+# leading '/' so that e.g. 'mydocs/' is not mistaken for 'docs/'.
+_SKIP_DIRS = ('/docs/', '/documentation/', '/examples/', '/demo/')
+_VALIDATED_TOOLS = frozenset({'Write', 'Edit', 'MultiEdit'})
+
+# Scanner patterns, compiled once at import
+_NEWLINE_RE = re.compile(r'\n')
+_MAGIC_NUMBER_RE = re.compile(r'\b(\d{3,})\b')
+# Absolute, relative and Windows paths in one alternation: every match starts
+# at a quote and never spans one, so a single pass finds the same paths
+_PATH_RE = re.compile(
+    r'["\']('
+    r'/[^"\'\\]+'  # Absolute paths
+    r'|\.\.?/[^"\'\\]+'  # Relative paths
+    r'|C:\\[^"\'\\]+'  # Windows paths
+    r')'
+)
+# System paths are always allowed in hardcoded-path checks
+_SYSTEM_PATH_RE = re.compile(r'/tmp/|/dev/|/proc/|/usr/|/bin/|/opt/')
+# (pattern, violation type, lowercase literal every match contains)
+_TEST_PATTERNS = (
+    (re.compile(r'assert.*==\s*[\d.]+', re.IGNORECASE), "hardcoded_test_expectation", 'assert'),
+    (re.compile(r'expected\s*=\s*[\d.]+', re.IGNORECASE), "hardcoded_expected_value", 'expected'),
+    (re.compile(r'result.*should.*[\d.]+', re.IGNORECASE), "hardcoded_assertion", 'should'),
+)
+# (pattern, violation type, literal every match contains for a quick reject)
+_DEFENSIVE_PATTERNS = (
+    (re.compile(r'\.get\([^,]+,\s*[^)]+\)'), "defensive_default", '.get('),
+    (re.compile(r'if\s+not\s+\w+:\s*\w+\s*=\s*[^#\n]+'), "fallback_assignment", 'not'),
+    (re.compile(r'except.*:\s*\w+\s*=\s*[^#\n]+'), "exception_default", 'except'),
+)
+# Comment words that mark a defensive default as deliberate
+_INTENT_MARKER_RE = re.compile(r'intentional|ok|allowed', re.IGNORECASE)
+_BROAD_EXCEPT_PATTERNS = (
+    (re.compile(r'except\s*:'), "bare_except"),
+    (re.compile(r'except\s+Exception\s*:'), "broad_exception"),
+    (re.compile(r'except.*:\s*pass'), "silent_exception"),
+)
+_FUNCTION_RE = re.compile(r'def\s+\w+\([^)]*\):')
+# Top-level def/class that ends the previous function; the lookahead keeps
+# matches from consuming the blank lines before the next boundary
+_FUNCTION_END_RE = re.compile(r'\n(?:def|class)(?=\s)')
+# First character of a line that is neither blank nor a comment; the
+# leading class excludes newlines so a match never spans two lines
+_CODE_LINE_RE = re.compile(r'^[^\S\n]*[^\s#]', re.MULTILINE)
+
+# Closing lines of every violation report
+_OVERRIDE_HELP = (
+    "\n🔧 Override options:\n"
+    "  - Add '# @policy-override: suggest' to file header\n"
+    "  - Set CLAUDE_VALIDATION_MODE=suggest environment variable\n"
+)
 
 def get_validation_mode(file_path: str, content: str) -> str:
     """Determine validation mode based on context."""
     
     # Check for explicit override in file
     if "# @policy-override:" in content:
-        override_match = re.search(r'# @policy-override:\s*(\w+)', content)
+        override_match = _OVERRIDE_RE.search(content)
         if override_match:
             return override_match.group(1)
     
@@ -33,15 +94,11 @@ def get_validation_mode(file_path: str, content: str) -> str:
     file_path_lower = file_path.lower()
     
     # Strict mode for production files
-    if any(keyword in file_path_lower for keyword in [
-        'prod', 'production', 'deploy', 'release', 'main.py', '__init__.py'
-    ]):
+    if _STRICT_PATH_RE.search(file_path_lower):
         return 'strict'
     
     # Suggest mode for prototype/experimental files
-    if any(keyword in file_path_lower for keyword in [
-        'prototype', 'experimental', 'demo', 'example', 'temp', 'tmp'
-    ]):
+    if _SUGGEST_PATH_RE.search(file_path_lower):
         return 'suggest'
     
     # Warn mode for development (default)
@@ -76,28 +133,74 @@ def get_project_context() -> Dict[str, str]:
     
     return context
 
+def build_line_index(content: str) -> List[int]:
+    """Return the offset of every newline in content, in ascending order."""
+    return [match.start() for match in _NEWLINE_RE.finditer(content)]
+
+def line_number(line_index: List[int], offset: int) -> int:
+    """Return the 1-based line number of a character offset."""
+    return bisect.bisect_left(line_index, offset) + 1
+
+def tokenize_python_numbers(content: str) -> Optional[List]:
+    """Return the NUMBER tokens of Python source, or None if it does not tokenize."""
+    # Imported here: only .py writes need it
+    import tokenize
+    
+    try:
+        return [token for token in tokenize.generate_tokens(io.StringIO(content).readline)
+                if token.type == tokenize.NUMBER]
+    except (tokenize.TokenError, SyntaxError):
+        # Partial or invalid source (e.g. an Edit fragment): caller scans raw text
+        return None
+
+def python_number_offsets(content: str, line_index: List[int]) -> Optional[Set[int]]:
+    """Return the offsets of magic-number matches inside Python numeric literals.
+    
+    None means the literals could not be located (untokenizable source, or
+    token positions that disagree with the newline index).
+    """
+    number_tokens = tokenize_python_numbers(content)
+    if number_tokens is None:
+        return None
+    
+    line_starts = [0] + [offset + 1 for offset in line_index]
+    offsets = set()
+    for token in number_tokens:
+        token_start = line_starts[token.start[0] - 1] + token.start[1]
+        if not content.startswith(token.string, token_start):
+            return None
+        offsets.update(token_start + match.start()
+                       for match in _MAGIC_NUMBER_RE.finditer(token.string))
+    return offsets
+
 def scan_policy_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
     """Scan content for policy violations with mode-aware severity."""
     violations = []
+    line_index = build_line_index(content)
     
     # Canon-First Policy Violations
-    violations.extend(scan_hardcoding_violations(content, file_path, mode))
+    violations.extend(scan_hardcoding_violations(content, line_index, file_path, mode))
     
     # Data Authority Policy Violations  
-    violations.extend(scan_data_authority_violations(content, file_path, mode))
+    violations.extend(scan_data_authority_violations(content, line_index, file_path, mode))
+    
+    # Remaining scanners match Python syntax (.get, except, def) only
+    if file_path.endswith('.m'):
+        return violations
     
     # Fail Fast Policy Violations
-    violations.extend(scan_fail_fast_violations(content, file_path, mode))
+    violations.extend(scan_fail_fast_violations(content, line_index, file_path, mode))
     
     # Exception Handling Policy Violations
-    violations.extend(scan_exception_handling_violations(content, file_path, mode))
+    violations.extend(scan_exception_handling_violations(content, line_index, file_path, mode))
     
     # KISS Principle Violations
-    violations.extend(scan_kiss_violations(content, file_path, mode))
+    violations.extend(scan_kiss_violations(content, line_index, file_path, mode))
     
     return violations
 
-def scan_hardcoding_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
+def scan_hardcoding_violations(content: str, line_index: List[int], file_path: str = "",
+                             mode: str = "warn") -> List[Dict]:
     """Scan for hardcoding violations with mode-aware severity."""
     violations = []
     
@@ -113,96 +216,97 @@ def scan_hardcoding_violations(content: str, file_path: str = "", mode: str = "w
     else:  # warn mode
         allowed_numbers = base_allowed | {200, 404, 500}
     
-    for match in re.finditer(r'\b(\d{3,})\b', content):
+    # Cheap raw scan first: most content has no disallowed number at all
+    magic_matches = [match for match in _MAGIC_NUMBER_RE.finditer(content)
+                     if int(match.group(1)) not in allowed_numbers]
+    
+    # Python: only numeric literals count, not digits in strings or comments.
+    # Tokenizing costs more than the whole raw scan, so it only runs when
+    # there is something to filter; every literal match is also a raw match.
+    if magic_matches and file_path.endswith('.py'):
+        literal_offsets = python_number_offsets(content, line_index)
+        if literal_offsets is not None:
+            magic_matches = [match for match in magic_matches
+                             if match.start() in literal_offsets]
+    
+    for match in magic_matches:
         number = int(match.group(1))
-        if number not in allowed_numbers:
-            severity = "error" if mode == "strict" else "warning" if mode == "warn" else "suggestion"
-            violations.append({
-                "type": "magic_number",
-                "severity": severity,
-                "policy": "canon-first",
-                "value": match.group(1),
-                "line": content[:match.start()].count('\n') + 1,
-                "message": f"Magic number '{number}' should be in config",
-                "suggestion": f"Move to config file or define as named constant"
-            })
+        severity = "error" if mode == "strict" else "warning" if mode == "warn" else "suggestion"
+        violations.append({
+            "type": "magic_number",
+            "severity": severity,
+            "policy": "canon-first",
+            "value": match.group(1),
+            "line": line_number(line_index, match.start()),
+            "message": f"Magic number '{number}' should be in config",
+            "suggestion": f"Move to config file or define as named constant"
+        })
     
     # Hardcoded paths (mode-aware)
-    path_patterns = [
-        r'["\'](/[^"\'\\]+)',  # Absolute paths
-        r'["\'](\.\.?/[^"\'\\]+)',  # Relative paths  
-        r'["\'](C:\\[^"\'\\]+)',  # Windows paths
-    ]
-    
-    for pattern in path_patterns:
-        for match in re.finditer(pattern, content):
-            path = match.group(1)
-            # System paths are always allowed
-            if any(skip in path for skip in ['/tmp/', '/dev/', '/proc/', '/usr/', '/bin/', '/opt/']):
-                continue
-                
-            # Mode-specific handling
-            if mode == 'suggest' and len(path) < 20:  # Short paths ok in prototype
-                continue
-                
-            severity = "error" if mode == "strict" else "warning" if mode == "warn" else "suggestion"
-            violations.append({
-                "type": "hardcoded_path",
-                "severity": severity,
-                "policy": "canon-first",
-                "value": path,
-                "line": content[:match.start()].count('\n') + 1,
-                "message": f"Hardcoded path '{path}' should be configurable",
-                "suggestion": "Use environment variable or config file"
-            })
+    for match in _PATH_RE.finditer(content):
+        path = match.group(1)
+        # System paths are always allowed
+        if _SYSTEM_PATH_RE.search(path):
+            continue
+            
+        # Mode-specific handling
+        if mode == 'suggest' and len(path) < 20:  # Short paths ok in prototype
+            continue
+            
+        severity = "error" if mode == "strict" else "warning" if mode == "warn" else "suggestion"
+        violations.append({
+            "type": "hardcoded_path",
+            "severity": severity,
+            "policy": "canon-first",
+            "value": path,
+            "line": line_number(line_index, match.start()),
+            "message": f"Hardcoded path '{path}' should be configurable",
+            "suggestion": "Use environment variable or config file"
+        })
     
     return violations
 
-def scan_data_authority_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
+def scan_data_authority_violations(content: str, line_index: List[int], file_path: str = "",
+                                 mode: str = "warn") -> List[Dict]:
     """Scan for data authority violations."""
     violations = []
     
     # Test data hardcoding
     if 'test' not in file_path.lower():  # Allow in test files
-        test_patterns = [
-            (r'assert.*==\s*[\d.]+', "hardcoded_test_expectation"),
-            (r'expected\s*=\s*[\d.]+', "hardcoded_expected_value"),
-            (r'result.*should.*[\d.]+', "hardcoded_assertion"),
-        ]
-        
-        for pattern, violation_type in test_patterns:
-            for match in re.finditer(pattern, content, re.IGNORECASE):
+        # Patterns ignore case; casefold once so the literal checks agree
+        content_folded = content.casefold()
+        for pattern, violation_type, literal in _TEST_PATTERNS:
+            if literal not in content_folded:
+                continue
+            for match in pattern.finditer(content):
                 severity = "error" if mode == "strict" else "warning"
                 violations.append({
                     "type": violation_type,
                     "severity": severity,
                     "policy": "data-authority",
                     "value": match.group(0),
-                    "line": content[:match.start()].count('\n') + 1,
+                    "line": line_number(line_index, match.start()),
                     "message": "Test expectations should be computed, not hardcoded",
                     "suggestion": "Use reference computation or simulator"
                 })
     
     return violations
 
-def scan_fail_fast_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
+def scan_fail_fast_violations(content: str, line_index: List[int], file_path: str = "",
+                            mode: str = "warn") -> List[Dict]:
     """Scan for fail-fast violations."""
     violations = []
     
     # Defensive default patterns
-    defensive_patterns = [
-        (r'\.get\([^,]+,\s*[^)]+\)', "defensive_default"),
-        (r'if\s+not\s+\w+:\s*\w+\s*=\s*[^#\n]+', "fallback_assignment"),
-        (r'except.*:\s*\w+\s*=\s*[^#\n]+', "exception_default"),
-    ]
-    
-    for pattern, violation_type in defensive_patterns:
-        for match in re.finditer(pattern, content):
+    for pattern, violation_type, literal in _DEFENSIVE_PATTERNS:
+        if literal not in content:
+            continue
+        for match in pattern.finditer(content):
             # Skip if it's clearly intentional (has comment)
             line_end = content.find('\n', match.end())
             line = content[match.start():line_end if line_end != -1 else len(content)]
             
-            if '#' in line and any(word in line.lower() for word in ['intentional', 'ok', 'allowed']):
+            if '#' in line and _INTENT_MARKER_RE.search(line):
                 continue
                 
             severity = "warning" if mode != "suggest" else "suggestion"
@@ -211,71 +315,71 @@ def scan_fail_fast_violations(content: str, file_path: str = "", mode: str = "wa
                 "severity": severity,
                 "policy": "fail-fast",
                 "value": match.group(0),
-                "line": content[:match.start()].count('\n') + 1,
+                "line": line_number(line_index, match.start()),
                 "message": "Avoid defensive defaults, fail fast instead",
                 "suggestion": "Validate requirements explicitly and fail with clear error"
             })
     
     return violations
 
-def scan_exception_handling_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
+def scan_exception_handling_violations(content: str, line_index: List[int], file_path: str = "",
+                                     mode: str = "warn") -> List[Dict]:
     """Scan for exception handling violations."""
     violations = []
     
-    # Broad exception handling
-    broad_patterns = [
-        (r'except\s*:', "bare_except"),
-        (r'except\s+Exception\s*:', "broad_exception"),
-        (r'except.*:\s*pass', "silent_exception"),
-    ]
+    # Every pattern below needs an except clause
+    if 'except' not in content:
+        return violations
     
-    for pattern, violation_type in broad_patterns:
-        for match in re.finditer(pattern, content):
+    # Broad exception handling
+    for pattern, violation_type in _BROAD_EXCEPT_PATTERNS:
+        for match in pattern.finditer(content):
             severity = "error" if mode == "strict" else "warning"
             violations.append({
                 "type": violation_type,
                 "severity": severity,
                 "policy": "exception-handling",
                 "value": match.group(0),
-                "line": content[:match.start()].count('\n') + 1,
+                "line": line_number(line_index, match.start()),
                 "message": "Use specific exception handling",
                 "suggestion": "Catch specific exceptions and handle appropriately"
             })
     
     return violations
 
-def scan_kiss_violations(content: str, file_path: str = "", mode: str = "warn") -> List[Dict]:
+def scan_kiss_violations(content: str, line_index: List[int], file_path: str = "",
+                       mode: str = "warn") -> List[Dict]:
     """Scan for KISS principle violations."""
     violations = []
     
+    if 'def' not in content:
+        return violations
+    
+    # Simple heuristic: a function runs until the next top-level def or class.
+    # Locate every boundary in one pass instead of re-searching per function.
+    function_ends = [m.start() for m in _FUNCTION_END_RE.finditer(content)]
+    
     # Function length (approximate)
-    function_pattern = r'def\s+\w+\([^)]*\):'
-    for match in re.finditer(function_pattern, content):
-        # Find function end (next def or end of file)
-        start_line = content[:match.start()].count('\n') + 1
-        
-        # Simple heuristic: count lines until next def or class
-        rest_content = content[match.end():]
-        next_def = re.search(r'\n(def|class)\s+', rest_content)
+    for match in _FUNCTION_RE.finditer(content):
+        start_line = line_number(line_index, match.start())
         
-        if next_def:
-            func_content = rest_content[:next_def.start()]
-        else:
-            func_content = rest_content
+        # Find function end (next def or end of file)
+        end_index = bisect.bisect_left(function_ends, match.end())
+        func_end = function_ends[end_index] if end_index < len(function_ends) else len(content)
+        func_content = content[match.end():func_end]
         
         # Count non-empty, non-comment lines
-        func_lines = [l.strip() for l in func_content.split('\n') 
-                     if l.strip() and not l.strip().startswith('#')]
+        func_line_count = len(_CODE_LINE_RE.findall(func_content))
         
-        if len(func_lines) > 40:
+        if func_line_count > 40:
             severity = "warning" if mode != "suggest" else "suggestion"
             violations.append({
                 "type": "long_function",
                 "severity": severity,
                 "policy": "kiss-principle",
-                "value": f"~{len(func_lines)} lines",
+                "value": f"~{func_line_count} lines",
                 "line": start_line,
-                "message": f"Function is {len(func_lines)} lines, consider breaking down",
+                "message": f"Function is {func_line_count} lines, consider breaking down",
                 "suggestion": "Split into smaller, focused functions"
             })
     
@@ -283,17 +387,16 @@ def scan_kiss_violations(content: str, file_path: str = "", mode: str = "warn")
 
 def should_validate_file(file_path: str, tool_name: str) -> bool:
     """Determine if file should be validated."""
-    if tool_name not in ["Write", "Edit", "MultiEdit"]:
+    if tool_name not in _VALIDATED_TOOLS:
         return False
     
     # Skip certain file types
-    skip_extensions = {'.md', '.txt', '.json', '.yaml', '.yml', '.xml', '.html', '.log'}
-    if any(file_path.endswith(ext) for ext in skip_extensions):
+    if os.path.splitext(file_path)[1] in _SKIP_EXTENSIONS:
         return False
     
     # Skip documentation (they may have intentional examples)
-    skip_patterns = ['docs/', 'documentation/', 'examples/', 'demo/']
-    if any(pattern in file_path.lower() for pattern in skip_patterns):
+    file_path_lower = '/' + file_path.lower()
+    if any(pattern in file_path_lower for pattern in _SKIP_DIRS):
         return False
     
     return True
@@ -303,46 +406,49 @@ def format_violation_report(violations: List[Dict], mode: str, file_path: str) -
     if not violations:
         return ""
     
-    # Group by severity
-    errors = [v for v in violations if v.get('severity') == 'error']
-    warnings = [v for v in violations if v.get('severity') == 'warning']
-    suggestions = [v for v in violations if v.get('severity') == 'suggestion']
+    # Group by severity in a single pass
+    by_severity = {'error': [], 'warning': [], 'suggestion': []}
+    for v in violations:
+        bucket = by_severity.get(v.get('severity'))
+        if bucket is not None:
+            bucket.append(v)
+    errors = by_severity['error']
+    warnings = by_severity['warning']
+    suggestions = by_severity['suggestion']
     
-    report = f"POLICY VALIDATION ({mode.upper()} mode) for {file_path}:\n\n"
+    parts = [f"POLICY VALIDATION ({mode.upper()} mode) for {file_path}:\n\n"]
     
     if errors:
-        report += "🚫 ERRORS (blocking):\n"
+        parts.append("🚫 ERRORS (blocking):\n")
         for v in errors:
-            report += f"  Line {v['line']}: {v['message']}\n"
-            report += f"    Policy: {v['policy']} | Type: {v['type']}\n"
-            report += f"    Suggestion: {v['suggestion']}\n\n"
+            parts.append(f"  Line {v['line']}: {v['message']}\n"
+                         f"    Policy: {v['policy']} | Type: {v['type']}\n"
+                         f"    Suggestion: {v['suggestion']}\n\n")
     
     if warnings:
-        report += "⚠️  WARNINGS:\n"
+        parts.append("⚠️  WARNINGS:\n")
         for v in warnings:
-            report += f"  Line {v['line']}: {v['message']}\n"
-            report += f"    Policy: {v['policy']} | Suggestion: {v['suggestion']}\n\n"
+            parts.append(f"  Line {v['line']}: {v['message']}\n"
+                         f"    Policy: {v['policy']} | Suggestion: {v['suggestion']}\n\n")
     
     if suggestions:
-        report += "💡 SUGGESTIONS:\n"
+        parts.append("💡 SUGGESTIONS:\n")
         for v in suggestions:
-            report += f"  Line {v['line']}: {v['message']}\n"
-            report += f"    Suggestion: {v['suggestion']}\n\n"
+            parts.append(f"  Line {v['line']}: {v['message']}\n"
+                         f"    Suggestion: {v['suggestion']}\n\n")
     
     # Mode-specific guidance
     if mode == 'suggest':
-        report += "ℹ️  Prototyping mode: These are suggestions to improve code quality.\n"
+        parts.append("ℹ️  Prototyping mode: These are suggestions to improve code quality.\n")
     elif mode == 'warn':
-        report += "ℹ️  Development mode: Address warnings before production.\n"
+        parts.append("ℹ️  Development mode: Address warnings before production.\n")
     elif mode == 'strict':
-        report += "ℹ️  Production mode: All errors must be fixed.\n"
+        parts.append("ℹ️  Production mode: All errors must be fixed.\n")
     
     # Override instructions
-    report += "\n🔧 Override options:\n"
-    report += "  - Add '# @policy-override: suggest' to file header\n"
-    report += "  - Set CLAUDE_VALIDATION_MODE=suggest environment variable\n"
+    parts.append(_OVERRIDE_HELP)
     
-    return report
+    return "".join(parts)
 
 def main():
     """Main validation processor."""
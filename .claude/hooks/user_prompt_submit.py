@@ -14,6 +14,36 @@ import os
 import subprocess
 from typing import Dict, List, Optional
 
+# Explicit agent requests share one compiled pattern; the named group that
+# matched identifies the agent. Routes are listed in priority order.
+_EXPLICIT_RE = re.compile(
+    r'\b(only|just)\s+(?:(?P<test>test|testing)|(?P<debug>debug|debugging)'
+    r'|(?P<docs>document|documentation|docs))\b'
+)
+_EXPLICIT_ROUTES = (
+    ("test", "tester", "explicit_test"),
+    ("debug", "debugger", "explicit_debug"),
+    ("docs", "doc-writer", "explicit_documentation"),
+)
+
+# Whole-word keyword sets, matched against the prompt's word tokens
+_WORD_RE = re.compile(r'\w+')
+_TEST_KEYWORDS = frozenset({'test', 'pytest', 'unittest', 'coverage', 'assert'})
+_DEBUG_KEYWORDS = frozenset({'debug', 'trace', 'investigate', 'diagnose', 'broken'})
+_DOC_KEYWORDS = frozenset({
+    'document', 'documentation', 'readme', 'guide', 'tutorial', 'explain',
+    'describe', 'writeup', 'docstring', 'manual', 'reference', 'wiki'
+})
+_FIX_BUG_RE = re.compile(r'\bfix.*bug\b')
+
+# Core directive (CRITICAL for token efficiency), built once at import
+_DIRECTIVE_TEMPLATE = """[ROUTER] Agent={agent} | Mode={mode}
+
+DIRECTIVE: Return ONLY a unified diff + 1-line title. No explanations, no reasoning, no summaries.
+
+TASK: {prompt}"""
+_NO_CHANGES_LINE = "\n\nFILES CHANGED: No git changes detected"
+
 def route_prompt(prompt: str, budget_remaining: int = 999) -> Dict:
     """
     Fast regex-based routing to single agent.
@@ -35,24 +65,22 @@ def route_prompt(prompt: str, budget_remaining: int = 999) -> Dict:
             "specialized": False
         }
     
-    # Explicit agent requests (highest priority)
-    if re.search(r'\b(only|just)\s+(test|testing)\b', prompt_lower):
-        return {"agent": "tester", "reason": "explicit_test", "specialized": True}
+    # Explicit agent requests (highest priority), found in a single scan
+    explicit = {match.lastgroup for match in _EXPLICIT_RE.finditer(prompt_lower)}
+    for group, agent, reason in _EXPLICIT_ROUTES:
+        if group in explicit:
+            return {"agent": agent, "reason": reason, "specialized": True}
     
-    if re.search(r'\b(only|just)\s+(debug|debugging)\b', prompt_lower):
-        return {"agent": "debugger", "reason": "explicit_debug", "specialized": True}
+    # Specialized task detection: tokenize once, then set lookups
+    tokens = set(_WORD_RE.findall(prompt_lower))
     
-    if re.search(r'\b(only|just)\s+(document|documentation|docs)\b', prompt_lower):
-        return {"agent": "doc-writer", "reason": "explicit_documentation", "specialized": True}
-    
-    # Specialized task detection
-    if re.search(r'\b(test|pytest|unittest|coverage|assert)\b', prompt_lower):
+    if not tokens.isdisjoint(_TEST_KEYWORDS):
         return {"agent": "tester", "reason": "test_keywords", "specialized": True}
     
-    if re.search(r'\b(debug|trace|investigate|diagnose|broken|fix.*bug)\b', prompt_lower):
+    if not tokens.isdisjoint(_DEBUG_KEYWORDS) or _FIX_BUG_RE.search(prompt_lower):
         return {"agent": "debugger", "reason": "debug_keywords", "specialized": True}
     
-    if re.search(r'\b(document|documentation|readme|guide|tutorial|explain|describe|writeup|docstring|manual|reference|wiki)\b', prompt_lower):
+    if not tokens.isdisjoint(_DOC_KEYWORDS):
         return {"agent": "doc-writer", "reason": "documentation_keywords", "specialized": True}
     
     # Default: coder handles everything else
@@ -134,30 +162,22 @@ def create_compact_context(route: Dict, prompt: str, hunks: Dict[str, str]) -> s
     Returns:
         Compact context string
     """
-    agent = route["agent"]
-    specialized = route.get("specialized", False)
-    
-    # Core directive (CRITICAL for token efficiency)
-    directive = f"""[ROUTER] Agent={agent} | Mode={'specialized' if specialized else 'general'}
-
-DIRECTIVE: Return ONLY a unified diff + 1-line title. No explanations, no reasoning, no summaries.
-
-TASK: {prompt}"""
+    mode = 'specialized' if route.get("specialized", False) else 'general'
+    parts = [_DIRECTIVE_TEMPLATE.format(agent=route["agent"], mode=mode, prompt=prompt)]
     
     # Add relevant context
-    if hunks and len(hunks) > 0:
-        directive += f"\n\nFILES CHANGED: {len(hunks)} files"
+    if hunks:
+        parts.append(f"\n\nFILES CHANGED: {len(hunks)} files")
         
         # Show first few file names (not full content to save tokens)
-        file_list = list(hunks.keys())[:5]
-        if file_list:
-            directive += f"\n- " + "\n- ".join(file_list)
-            if len(hunks) > 5:
-                directive += f"\n- ... and {len(hunks) - 5} more files"
+        file_list = list(hunks)[:5]
+        parts.append("\n- " + "\n- ".join(file_list))
+        if len(hunks) > 5:
+            parts.append(f"\n- ... and {len(hunks) - 5} more files")
     else:
-        directive += "\n\nFILES CHANGED: No git changes detected"
+        parts.append(_NO_CHANGES_LINE)
     
-    return directive
+    return "".join(parts)
 
 def main():
     """Main router execution"""